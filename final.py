@@ -1,84 +1,124 @@
+from __future__ import annotations
+
+import csv
 import json
 import os
+import re
 import argparse
-import pandas as pd
-import tempfile
-import glob
-from pypdf import PdfReader, PdfWriter
-from typing import List, Optional, Dict, Any
-
-# LangChain and Docling Imports
-from langchain_docling import DoclingLoader
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-
-# Advanced Docling Configuration Imports
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
-from langchain_docling.loader import ExportType
-
-def clean_monetary_value(value):
-    """Clean monetary values to ensure they are pure numbers."""
-    if value is None or value == "":
-        return None
-    
-    # Convert to string if it's not already
-    str_value = str(value).strip()
-    
-    if not str_value or str_value.lower() in ['null', 'none', 'n/a', '-']:
-        return None
-    
-    # Remove common monetary suffixes and prefixes
-    # Remove Cr, Dr, Credit, Debit (case insensitive)
-    import re
-    str_value = re.sub(r'\b(cr|dr|credit|debit)\b', '', str_value, flags=re.IGNORECASE)
-    
-    # Remove currency symbols and common prefixes
-    str_value = re.sub(r'[₹$£€¥₹Rs\.USD\s]', '', str_value)
-    
-    # Remove commas
-    str_value = str_value.replace(',', '')
-    
-    # Remove any remaining non-digit characters except decimal point and minus
-    str_value = re.sub(r'[^\d\.\-]', '', str_value)
-    
-    # Handle empty string after cleaning
-    if not str_value:
-        return None
-    
-    try:
-        # Convert to float and take absolute value (monetary amounts should always be positive)
-        # Debit means "money out" but the amount itself should be positive
-        # Credit means "money in" and the amount should be positive
-        return abs(float(str_value))
-    except (ValueError, TypeError):
-        return None
+import logging
+import orjson
+import functools
+from collections import Counter
+import hashlib
+import threading
+import importlib.metadata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pypdfium2 as pdfium
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 
-def parse_with_retry(chain, input_data: dict, max_retries: int = 2):
-    """Parse with retry logic for malformed JSON responses."""
-    for attempt in range(max_retries + 1):
-        try:
-            result = chain.invoke(input_data)
-            return result
-        except Exception as e:
-            if attempt < max_retries:
-                print(f"  ⚠ Parse attempt {attempt + 1} failed: {e}. Retrying...")
-                continue
-            else:
-                print(f"  ❌ All parse attempts failed. Last error: {e}")
-                raise e
+# Docling, LangChain and pandas take seconds to import, so they are imported where they are used;
+# `--help` and argument errors return immediately
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.messages import BaseMessage
+    from langchain_core.runnables import RunnableLambda
+    from docling.document_converter import DocumentConverter
 
-def extract_headers_only(pdf_path: str, model_name: str, max_pages_to_scan: int = 3) -> Optional[Dict[str, Any]]:
-    """
-    Scan the first few pages of the PDF to extract only the column headers/structure.
-    Returns the standardized column structure that will be used for all pages.
-    """
-    print(f"Scanning first {max_pages_to_scan} pages for column headers...")
-    
-    header_extraction_prompt = PromptTemplate(
-        template="""
+logger = logging.getLogger(__name__)
+
+# Docling's layout and TableFormer models run on torch, which reads OMP_NUM_THREADS at import time
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 1))
+
+# Number of pages sent to Ollama concurrently; match the server's OLLAMA_NUM_PARALLEL
+LLM_MAX_CONCURRENCY = 8
+
+# Pages packed into one LLM call once the context page is done. Prompt size is estimated at
+# ~4 characters per token. The JSON reply (quoted cells, nulls, reformatted dates) runs longer than
+# the CSV it was read from, so half of the context window is kept for it. The reserve is also the
+# num_predict limit, so a reply that outgrows it stops and fails instead of being context-shifted
+LLM_BATCH_PAGES = 4
+CHARS_PER_TOKEN = 4
+LLM_OUTPUT_TOKEN_RESERVE = 4096
+
+# Ollama settings shared by every call. Keeping them constant (and the model loaded) lets the
+# server reuse the KV cache of the static system prompt between pages
+OLLAMA_NUM_CTX = 8192
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Two or more consecutive markdown pipe-table rows
+TABLE_BLOCK_PATTERN = re.compile(r'(?:^[ \t]*\|.*\|[ \t]*$\n?){2,}', re.MULTILINE)
+
+# Cheap signals that a page holds transaction rows. Dates may omit the year, as many statements do:
+# 01/02/2024, 01-Jan-24, 2024-01-02, 01/15, 15 Jan, 15-Jan, Jan 15, Jan 1, 2024
+MONTH_NAME = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*'
+DATE_PATTERN = re.compile(
+    r'\b\d{1,4}[-/.](?:\d{1,2}|[A-Za-z]{3,9})[-/.]\d{2,4}\b'
+    r'|\b\d{1,2}[-/]\d{1,2}\b'
+    rf'|\b\d{{1,2}}[-\s]?{MONTH_NAME}\b'
+    rf'|\b{MONTH_NAME}\.?\s+\d{{1,2}}\b',
+    re.IGNORECASE
+)
+# A standalone number (1,250.50, 1250, 40): whole amounts count too, digits inside dates and times don't
+AMOUNT_PATTERN = re.compile(r'(?<![\w/.:-])\d[\d,]*(?:\.\d{1,2})?(?![\w/:-])')
+
+# A row of a table with three or more columns, as CSV or as a markdown pipe row
+TABLE_ROW_PATTERN = re.compile(r'^[^\n]*,[^\n]*,[^\n]*$|^[ \t]*\|.*\|.*\|[ \t]*$', re.MULTILINE)
+# A row of embedded-text-layer output, which has no delimiters: a date followed by two or more fields
+TEXT_ROW_PATTERN = re.compile(rf'^[ \t]*(?:{DATE_PATTERN.pattern})[ \t]+\S+[ \t]+\S', re.MULTILINE | re.IGNORECASE)
+
+# Header name → field name: spaces, slashes and dashes become underscores, '#' becomes 'no'
+FIELD_SLUG_TABLE = str.maketrans({' ': '_', '/': '_', '-': '_', '#': 'no', '.': None, '(': None, ')': None})
+
+# Everything that isn't part of the number in a monetary cell. Only a dot between two digits is a
+# decimal point; dots of abbreviations ("Rs.", "INR.", "Bal.") go, and so do signs ("500.00-"),
+# since amounts are made positive anyway
+MONETARY_STRIP_PATTERN = re.compile(r'(?<!\d)\.|\.(?!\d)|[^\d.]')
+
+# Pages scanned for column headers
+HEADER_SCAN_PAGES = 3
+
+# Pages per Docling conversion call in the pipeline. The first chunk holds just the header-scan pages;
+# later chunks convert in a background thread while the LLM works on earlier ones
+DOCLING_CHUNK_PAGES = 8
+
+# Shape of the header-scan reply, enforced by Ollama's structured outputs
+HEADER_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "column_structure": {
+            "type": "object",
+            "properties": {
+                "column_order": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "position": {"type": "integer"},
+                            "header_name": {"type": "string"},
+                            "data_type": {
+                                "type": "string",
+                                "enum": ["date", "description", "debit", "credit", "balance", "reference", "other"]
+                            },
+                            "standardized_field": {"type": "string"}
+                        },
+                        "required": ["position", "header_name", "data_type", "standardized_field"]
+                    }
+                },
+                "total_columns": {"type": "integer"},
+                "table_found": {"type": "boolean"}
+            },
+            "required": ["column_order", "total_columns", "table_found"]
+        }
+    },
+    "required": ["column_structure"]
+}
+
+# Pages whose embedded text layer has at least this many characters can skip Docling (--text-layer)
+TEXT_LAYER_MIN_CHARS = 200
+
+# Header-scan prompt; braces are doubled for the prompt template
+HEADER_SYSTEM_PROMPT = """
         You are a bank statement analyzer. Your ONLY job is to identify the column structure of the bank statement table from the provided text.
 
         Look for:
@@ -118,341 +158,805 @@ def extract_headers_only(pdf_path: str, model_name: str, max_pages_to_scan: int
         3. If a column doesn't fit standard types, use a descriptive custom field name
         4. ONLY analyze structure, do NOT extract transaction data
         5. Look for patterns even if headers span multiple lines
-        6. ONLY RETURN JSON, NO OTHER TEXT
-
-        Analyze this document text:
-        ```markdown
-        {document_text}
-        ```
-        """,
-        input_variables=["document_text"],
+        """
+
+HEADER_USER_PROMPT = """Analyze this document text (tables are given as CSV):
+```
+{document_text}
+```"""
+
+# Converted page markdown is cached here, keyed by PDF content and Docling settings
+MARKDOWN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bank-extract")
+
+# Parsed LLM replies are cached here, keyed by model and the fully rendered prompt
+LLM_CACHE_DIR = os.path.join(MARKDOWN_CACHE_DIR, "llm")
+
+def clean_monetary_values(values: List[Any]) -> List[Optional[float]]:
+    """
+    Convert raw monetary cells ("1,250.50 Cr", "Rs.500.00", "500.00-", 75.5) to positive floats in one pandas pass.
+    Debit already means "money out" and credit "money in", so all amounts are made positive.
+    Cells without a number (empty, "-", "N/A") become None.
+    """
+    import pandas as pd
+    
+    # Strip currency symbols, Cr/Dr markers, signs, commas and spaces, then parse what's left
+    raw_values = pd.Series(values, dtype=object).astype(str)
+    numbers = pd.to_numeric(raw_values.str.replace(MONETARY_STRIP_PATTERN, '', regex=True), errors='coerce').abs()
+    return [None if pd.isna(number) else float(number) for number in numbers]
+
+def create_chat_model(model_name: str, response_schema: Optional[Dict[str, Any]] = None) -> ChatOllama:
+    """
+    Create the Ollama chat model with the settings used for every extraction call.
+    With a JSON schema Ollama constrains decoding to replies of exactly that shape, so they always parse;
+    without one it still guarantees valid JSON.
+    """
+    from langchain_ollama import ChatOllama
+    
+    return ChatOllama(
+        model=model_name,
+        temperature=0.1,
+        num_ctx=OLLAMA_NUM_CTX,
+        num_predict=LLM_OUTPUT_TOKEN_RESERVE,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        format=response_schema or "json"
     )
+
+def parse_json_response(message: BaseMessage) -> Any:
+    """Parse a JSON-mode model reply with orjson; a reply cut off at num_predict counts as failed."""
+    if message.response_metadata.get("done_reason") == "length":
+        raise ValueError("reply hit the output token limit")
+    return orjson.loads(message.content)
+
+@functools.lru_cache(maxsize=1)
+def get_json_parser() -> RunnableLambda:
+    """Return the shared output parser that ends every chain."""
+    from langchain_core.runnables import RunnableLambda
+    
+    return RunnableLambda(parse_json_response)
+
+@functools.lru_cache(maxsize=1)
+def get_header_prompt() -> ChatPromptTemplate:
+    """Return the header-scan prompt, built once per process."""
+    from langchain_core.prompts import ChatPromptTemplate
     
-    parser = JsonOutputParser()
-    model = ChatOllama(model=model_name, temperature=0.1)
+    return ChatPromptTemplate.from_messages([
+        ("system", HEADER_SYSTEM_PROMPT),
+        ("user", HEADER_USER_PROMPT),
+    ])
+
+def write_cache_file(path: str, data: bytes):
+    """
+    Write a cache entry atomically: the data goes to a temporary file that is then renamed into place,
+    so an interrupted run or a concurrent reader never sees a half-written entry.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def get_llm_cache_path(model_name: str, role: str, prompt: ChatPromptTemplate, input_data: dict) -> str:
+    """
+    Return the cache file for one LLM call.
+    The key hashes the rendered prompt, so the column structure, previous context and page text all take part.
+    """
+    prompt_text = prompt.format(**input_data)
+    key = hashlib.sha256(f"{model_name}|{role}|{prompt_text}".encode()).hexdigest()
+    return os.path.join(LLM_CACHE_DIR, f"{key}.json")
+
+def load_cached_llm_response(cache_path: str) -> Optional[Any]:
+    """Return the cached parsed reply, or None if there is none."""
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, "rb") as f:
+        try:
+            return orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            # A truncated entry left by an older, non-atomic write; treat it as a miss
+            return None
+
+def save_cached_llm_response(cache_path: str, result: Any):
+    """Store a parsed reply so an identical call can skip Ollama."""
+    write_cache_file(cache_path, orjson.dumps(result))
+
+@functools.lru_cache(maxsize=4)
+def get_document_converter(
+    pdf_backend: str = "pypdfium",
+    table_mode: str = "accurate",
+    num_threads: Optional[int] = None,
+    device: str = "auto"
+) -> DocumentConverter:
+    """
+    Build the Docling converter once and reuse it for every page and every run.
+    Constructing a DocumentConverter loads the layout and TableFormer models, so it must not happen per page.
+    pdf_backend selects the PDF parser: "pypdfium" (faster, lighter) or "native" (Docling's default docling-parse).
+    table_mode selects the TableFormer model: "accurate" or "fast" (several times quicker, less exact on complex tables).
+    num_threads defaults to OMP_NUM_THREADS (all cores unless the caller set it); worker processes pass their share instead.
+    device runs the layout and TableFormer models on "auto", "cpu", "cuda" or "mps".
+    """
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, AcceleratorOptions, AcceleratorDevice
+    
+    pipeline_options = PdfPipelineOptions(do_table_structure=True)
+    pipeline_options.table_structure_options.do_cell_matching = True
+    pipeline_options.table_structure_options.mode = (
+        TableFormerMode.FAST if table_mode == "fast" else TableFormerMode.ACCURATE
+    )
+    # AUTO picks CUDA (or MPS) when available; Docling also falls back to CPU when a requested device is missing
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        num_threads=num_threads or int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 1)),
+        device=AcceleratorDevice(device)
+    )
+    if pdf_backend == "pypdfium":
+        pdf_format_option = PdfFormatOption(pipeline_options=pipeline_options, backend=PyPdfiumDocumentBackend)
+    else:
+        pdf_format_option = PdfFormatOption(pipeline_options=pipeline_options)
+    docling_format_options = {InputFormat.PDF: pdf_format_option}
+    return DocumentConverter(format_options=docling_format_options)
+
+def build_page_text(document, page_no: int) -> str:
+    """
+    Build the text sent to the LLM for one page of a converted DoclingDocument.
+    Pages with detected tables are reduced to those tables, serialized from Docling's structured
+    cells as CSV, plus the first non-table line as a short header. Other pages use the full markdown.
+    """
+    # export_to_markdown(page_no=...) only renders items whose provenance is on that page
+    page_markdown = document.export_to_markdown(page_no=page_no)
+    
+    page_tables = [table for table in document.tables if table.prov and table.prov[0].page_no == page_no]
+    if not page_tables:
+        return page_markdown
+    
+    # Keep a short header line (usually the statement or section title) for context
+    remaining_text = TABLE_BLOCK_PATTERN.sub('', page_markdown)
+    header_line = next((line.strip() for line in remaining_text.splitlines() if line.strip()), "")
+    parts = [header_line[:200]] if header_line else []
+    
+    # CSV carries the same cells as the padded markdown table in far fewer tokens
+    for table in page_tables:
+        caption = table.caption_text(document)
+        table_csv = table.export_to_dataframe(doc=document).to_csv(index=False).strip()
+        parts.append(f"{caption}\n{table_csv}" if caption else table_csv)
+    
+    return "\n\n".join(parts)
+
+def convert_page_range(
+    pdf_path: str,
+    start_page: int,
+    end_page: int,
+    pdf_backend: str = "pypdfium",
+    table_mode: str = "accurate",
+    num_threads: Optional[int] = None,
+    device: str = "auto"
+) -> Dict[int, str]:
+    """
+    Convert pages start_page..end_page (1-based, inclusive) with Docling and split the result by page.
+    Top-level so it can run in a worker process; each worker keeps its own cached converter.
+    """
+    converter = get_document_converter(pdf_backend, table_mode, num_threads, device)
+    result = converter.convert(pdf_path, page_range=(start_page, end_page))
+    document = result.document
+    
+    return {page_no: build_page_text(document, page_no) for page_no in sorted(document.pages)}
+
+def extract_text_layer(pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    """
+    Read the embedded text layer of the given pages with pypdfium2.
+    Only pages with at least TEXT_LAYER_MIN_CHARS characters are returned; scanned pages have no
+    usable text layer and are left for Docling.
+    """
+    text_pages = {}
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for page_no in page_numbers:
+            page = pdf[page_no - 1]
+            textpage = page.get_textpage()
+            page_text = textpage.get_text_bounded().strip()
+            textpage.close()
+            page.close()
+            if len(page_text) >= TEXT_LAYER_MIN_CHARS:
+                text_pages[page_no] = page_text
+    finally:
+        pdf.close()
+    return text_pages
+
+def get_markdown_cache_dir(pdf_path: str, pdf_backend: str = "pypdfium", table_mode: str = "accurate") -> str:
+    """
+    Return the cache directory for this PDF's page markdown.
+    The key covers the file content, the Docling version and the conversion settings, so any change invalidates it.
+    """
+    hasher = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    hasher.update(
+        f"|docling={importlib.metadata.version('docling')}|backend={pdf_backend}"
+        f"|tableformer={table_mode}|tables=csv".encode()
+    )
+    return os.path.join(MARKDOWN_CACHE_DIR, hasher.hexdigest())
+
+def convert_pdf_to_page_markdown(
+    pdf_path: str,
+    pdf_backend: str = "pypdfium",
+    table_mode: str = "accurate",
+    workers: int = 1,
+    start_page: int = 1,
+    end_page: Optional[int] = None,
+    use_cache: bool = True,
+    use_text_layer: bool = False,
+    device: str = "auto"
+) -> Dict[int, str]:
+    """
+    Convert pages start_page..end_page (default: all) with Docling and split the resulting document by page.
+    With workers > 1 the pages are divided into contiguous ranges converted in parallel processes.
+    Pages already converted in an earlier run are read back from the on-disk markdown cache.
+    With use_text_layer, pages that carry an embedded text layer use that text and skip Docling.
+    device selects where Docling runs its models ("auto", "cpu", "cuda" or "mps").
+    Returns a mapping of 1-based page number to that page's markdown.
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    total_pages = len(pdf)
+    pdf.close()
+    end_page = min(end_page or total_pages, total_pages)
+    
+    page_markdowns = {}
+    if use_cache:
+        cache_dir = get_markdown_cache_dir(pdf_path, pdf_backend, table_mode)
+        for page_no in range(start_page, end_page + 1):
+            cache_path = os.path.join(cache_dir, f"page_{page_no}.md")
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    page_markdowns[page_no] = f.read()
+        if len(page_markdowns) == end_page - start_page + 1:
+            logger.info(f"✓ Loaded markdown for pages {start_page}-{end_page} from cache")
+            return page_markdowns
+    
+    if use_text_layer:
+        text_pages = extract_text_layer(
+            pdf_path,
+            [page_no for page_no in range(start_page, end_page + 1) if page_no not in page_markdowns]
+        )
+        if text_pages:
+            logger.info(f"✓ Using the embedded text layer for {len(text_pages)} pages")
+        page_markdowns.update(text_pages)
+    
+    missing_pages = [page_no for page_no in range(start_page, end_page + 1) if page_no not in page_markdowns]
+    if not missing_pages:
+        return page_markdowns
+    
+    # Convert only the contiguous runs of missing pages, so cached or text-layer pages in between aren't redone
+    page_runs = []
+    for page_no in missing_pages:
+        if page_runs and page_no == page_runs[-1][1] + 1:
+            page_runs[-1][1] = page_no
+        else:
+            page_runs.append([page_no, page_no])
+    
+    num_pages = len(missing_pages)
+    workers = max(1, min(workers, num_pages))
+    
+    # Split the runs into ranges of at most one worker's share each
+    chunk_size = -(-num_pages // workers)
+    page_ranges = [
+        (start, min(start + chunk_size - 1, run_end))
+        for run_start, run_end in page_runs
+        for start in range(run_start, run_end + 1, chunk_size)
+    ]
+    
+    converted = {}
+    if workers == 1:
+        for start, end in page_ranges:
+            converted.update(convert_page_range(pdf_path, start, end, pdf_backend, table_mode, device=device))
+    else:
+        # Share the threads between workers so torch doesn't oversubscribe the CPU
+        threads_per_worker = max(1, int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 1)) // workers)
+        logger.info(f"Converting {num_pages} pages with {workers} Docling workers...")
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(convert_page_range, pdf_path, start, end, pdf_backend, table_mode, threads_per_worker, device)
+                for start, end in page_ranges
+            ]
+            for future in futures:
+                converted.update(future.result())
+    
+    if use_cache:
+        for page_no, markdown_content in converted.items():
+            write_cache_file(os.path.join(cache_dir, f"page_{page_no}.md"), markdown_content.encode("utf-8"))
+    
+    page_markdowns.update(converted)
+    return dict(sorted(page_markdowns.items()))
+
+def extract_headers_only(
+    pdf_path: str,
+    model_name: str,
+    max_pages_to_scan: int = HEADER_SCAN_PAGES,
+    pdf_backend: str = "pypdfium",
+    table_mode: str = "accurate",
+    use_cache: bool = True,
+    page_markdowns: Optional[Dict[int, str]] = None,
+    device: str = "auto"
+) -> Optional[Dict[str, Any]]:
+    """
+    Scan the first few pages of the PDF to extract only the column headers/structure.
+    Pass page_markdowns from an earlier conversion to reuse it; otherwise each scanned page is converted here.
+    Returns the standardized column structure that will be used for all pages.
+    """
+    logger.info(f"Scanning first {max_pages_to_scan} pages for column headers...")
+    
+    header_extraction_prompt = get_header_prompt()
+    
+    parser = get_json_parser()
+    model = create_chat_model(model_name, HEADER_RESPONSE_SCHEMA)
     header_chain = header_extraction_prompt | model | parser
     
     # Try to extract headers from first few pages
-    with tempfile.TemporaryDirectory() as temp_dir:
-        try:
-            reader = PdfReader(pdf_path)
-            pages_to_scan = min(max_pages_to_scan, len(reader.pages))
+    try:
+        if page_markdowns is None:
+            pdf = pdfium.PdfDocument(pdf_path)
+            pages_to_scan = min(max_pages_to_scan, len(pdf))
+            pdf.close()
+        else:
+            pages_to_scan = min(max_pages_to_scan, len(page_markdowns))
+        
+        for i in range(pages_to_scan):
+            logger.info(f"Checking page {i+1} for headers...")
             
-            for i in range(pages_to_scan):
-                print(f"Checking page {i+1} for headers...")
-                
-                # Create single page PDF
-                writer = PdfWriter()
-                writer.add_page(reader.pages[i])
-                page_pdf_path = os.path.join(temp_dir, f"header_page_{i+1}.pdf")
-                with open(page_pdf_path, "wb") as f:
-                    writer.write(f)
-                
-                # Convert to markdown
-                pipeline_options = PdfPipelineOptions(do_table_structure=True)
-                pipeline_options.table_structure_options.do_cell_matching = True
-                pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
-                docling_format_options = {InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-                converter = DocumentConverter(format_options=docling_format_options)
-                
-                loader = DoclingLoader(
-                    file_path=page_pdf_path,
-                    export_type=ExportType.MARKDOWN,
-                    converter=converter
-                )
+            if page_markdowns is not None:
+                markdown_content = page_markdowns.get(i + 1, "")
+            else:
+                # Convert just this page; the cached converter keeps the models loaded between pages
+                markdown_content = convert_pdf_to_page_markdown(
+                    pdf_path,
+                    pdf_backend=pdf_backend,
+                    table_mode=table_mode,
+                    start_page=i + 1,
+                    end_page=i + 1,
+                    use_cache=use_cache,
+                    device=device
+                ).get(i + 1, "")
+            if not markdown_content.strip():
+                continue
+            if not has_table_rows(markdown_content):
+                logger.info(f"ⓘ Skipping page {i+1}: no table found")
+                continue
+            
+            # Try to extract headers
+            try:
+                input_data = {"document_text": markdown_content}
+                cache_path = get_llm_cache_path(model_name, "header", header_extraction_prompt, input_data)
+                result = load_cached_llm_response(cache_path) if use_cache else None
+                if result is not None:
+                    logger.info("✓ Reusing cached header response")
+                else:
+                    result = header_chain.invoke(input_data)
+                    if use_cache:
+                        save_cached_llm_response(cache_path, result)
                 
-                page_docs = loader.load()
-                if not page_docs or not page_docs[0].page_content.strip():
-                    continue
+                if (isinstance(result, dict) and 
+                    result.get('column_structure', {}).get('table_found', False) and
+                    result.get('column_structure', {}).get('column_order')):
                     
-                markdown_content = page_docs[0].page_content
-                
-                # Try to extract headers
-                try:
-                    result = parse_with_retry(header_chain, {"document_text": markdown_content})
+                    # Validate and fix column structure
+                    column_structure = result['column_structure']
+                    column_order = column_structure.get('column_order', [])
                     
-                    if (isinstance(result, dict) and 
-                        result.get('column_structure', {}).get('table_found', False) and
-                        result.get('column_structure', {}).get('column_order')):
+                    # --- START: De-duplicate standardized field names to prevent collisions ---
+                    seen_fields = set()
+                    duplicate_counts = Counter()
+                    for col in column_order:
+                        original_field = col.get('standardized_field')
                         
-                        # Validate and fix column structure
-                        column_structure = result['column_structure']
-                        column_order = column_structure.get('column_order', [])
-                        
-                        # --- START: De-duplicate standardized field names to prevent collisions ---
-                        seen_fields = set()
-                        for col in column_order:
-                            original_field = col.get('standardized_field')
+                        if not original_field:
+                            continue # Will be handled by the fallback logic later
+
+                        if original_field in seen_fields:
+                            # Duplicate found, create a new unique name from the header
+                            header_name = col.get('header_name', 'custom_field')
+                            new_field = slugify_header(header_name)
                             
-                            if not original_field:
-                                continue # Will be handled by the fallback logic later
-
-                            if original_field in seen_fields:
-                                # Duplicate found, create a new unique name from the header
-                                header_name = col.get('header_name', 'custom_field')
-                                new_field = (
-                                    header_name.lower()
-                                    .replace(' ', '_')
-                                    .replace('.', '')
-                                    .replace('#', 'no')
-                                    .replace('/', '_')
-                                    .replace('-', '_')
-                                    .replace('(', '')
-                                    .replace(')', '')
-                                )
-                                
-                                # Ensure it's truly unique by appending a number if needed
-                                counter = 2
-                                temp_field = new_field
-                                while temp_field in seen_fields:
-                                    temp_field = f"{new_field}_{counter}"
-                                    counter += 1
-                                new_field = temp_field
-                                
-                                col['standardized_field'] = new_field
-                                seen_fields.add(new_field)
+                            # Ensure it's truly unique by appending the next number for this name; the count
+                            # persists per name, so only a suffix the LLM already used itself is skipped
+                            base_field = new_field
+                            while new_field in seen_fields:
+                                duplicate_counts[base_field] += 1
+                                new_field = f"{base_field}_{duplicate_counts[base_field] + 1}"
+                            
+                            col['standardized_field'] = new_field
+                            seen_fields.add(new_field)
+                        else:
+                            seen_fields.add(original_field)
+                    # --- END: De-duplicate standardized field names ---
+
+                    # Fix any missing standardized_field entries
+                    for col in column_order:
+                        if 'standardized_field' not in col or not col.get('standardized_field'):
+                            # Auto-generate standardized field based on data_type
+                            data_type = col.get('data_type', 'unknown')
+                            if data_type == 'date':
+                                col['standardized_field'] = 'date'
+                            elif data_type == 'description':
+                                col['standardized_field'] = 'description'
+                            elif data_type == 'debit':
+                                col['standardized_field'] = 'debit'
+                            elif data_type == 'credit':
+                                col['standardized_field'] = 'credit'
+                            elif data_type == 'balance':
+                                col['standardized_field'] = 'running_balance'
+                            elif data_type == 'reference':
+                                col['standardized_field'] = 'reference'
                             else:
-                                seen_fields.add(original_field)
-                        # --- END: De-duplicate standardized field names ---
-
-                        # Fix any missing standardized_field entries
-                        for col in column_order:
-                            if 'standardized_field' not in col or not col.get('standardized_field'):
-                                # Auto-generate standardized field based on data_type
-                                data_type = col.get('data_type', 'unknown')
-                                if data_type == 'date':
-                                    col['standardized_field'] = 'date'
-                                elif data_type == 'description':
-                                    col['standardized_field'] = 'description'
-                                elif data_type == 'debit':
-                                    col['standardized_field'] = 'debit'
-                                elif data_type == 'credit':
-                                    col['standardized_field'] = 'credit'
-                                elif data_type == 'balance':
-                                    col['standardized_field'] = 'running_balance'
-                                elif data_type == 'reference':
-                                    col['standardized_field'] = 'reference'
-                                else:
-                                    # Create a field name from header name
-                                    header_name = col.get('header_name', 'unknown')
-                                    col['standardized_field'] = header_name.lower().replace(' ', '_').replace('.', '').replace('#', 'no')
-                        
-                        print(f"✓ Headers found on page {i+1}")
-                        print(f"Detected columns: {[col.get('header_name', 'Unknown') for col in column_order]}")
-                        return column_structure
-                        
-                except Exception as e:
-                    print(f"Error extracting headers from page {i+1}: {e}")
-                    continue
+                                # Create a field name from header name
+                                header_name = col.get('header_name', 'unknown')
+                                col['standardized_field'] = slugify_header(header_name)
                     
-        except Exception as e:
-            print(f"Error during header extraction: {e}")
-            return None
+                    logger.info(f"✓ Headers found on page {i+1}")
+                    logger.info(f"Detected columns: {[col.get('header_name', 'Unknown') for col in column_order]}")
+                    return column_structure
+                    
+            except Exception as e:
+                logger.error(f"Error extracting headers from page {i+1}: {e}")
+                continue
+                
+    except Exception as e:
+        logger.error(f"Error during header extraction: {e}")
+        return None
     
-    print("No clear table structure found in the first few pages.")
+    logger.warning("No clear table structure found in the first few pages.")
     return None
 
-def create_detailed_transaction_prompt(
-    column_structure: Dict[str, Any], 
-    last_transaction: Optional[Dict[str, Any]] = None
-) -> PromptTemplate:
+def slugify_header(header_name: str) -> str:
+    """Turn a column header into a field name, e.g. "Txn. Ref #" → "txn_ref_no"."""
+    return header_name.lower().translate(FIELD_SLUG_TABLE)
+
+def has_table_rows(page_text: str) -> bool:
     """
-    Create a detailed transaction extraction prompt based on your original specifications.
-    An optional last_transaction can be provided for context.
+    Quick check that a page holds a table (at least two multi-column rows).
+    Text-layer pages have no CSV or pipe rows, so rows that start with a date count as well.
+    Cover pages without one can't show column headers, so the header scan skips them.
     """
-    column_order = column_structure.get('column_order', [])
-    total_columns = column_structure.get('total_columns', 0)
+    # Count lines, not matches, so a line matching both patterns is still one row
+    rows = (line for line in page_text.splitlines() if TABLE_ROW_PATTERN.match(line) or TEXT_ROW_PATTERN.match(line))
+    return next(rows, None) is not None and next(rows, None) is not None
+
+def looks_like_transaction_page(page_text: str) -> bool:
+    """
+    Quick check that a page contains at least one date and one number.
+    It errs on the side of sending a page: only pages with no date at all (cover pages, terms,
+    blank pages) or no standalone number fail it and skip the LLM call.
+    """
+    return bool(DATE_PATTERN.search(page_text)) and bool(AMOUNT_PATTERN.search(page_text))
+
+def format_previous_context(last_transaction: Optional[Any] = None) -> str:
+    """
+    Render the previous page's last transaction as the context block of the transaction prompt.
+    last_transaction is the row as the LLM returned it (a value array, amounts as printed), so the
+    example matches the output format. Returns an empty string when there is no context yet.
+    """
+    if not last_transaction:
+        return ""
     
-    # Build field descriptions
-    field_descriptions = []
-    example_transaction = {}
+    # Sanitize for prompt injection; array rows keep their positions
+    if isinstance(last_transaction, list):
+        safe_last_tx = [v if v is None or isinstance(v, (str, int, float, bool)) else None for v in last_transaction]
+    else:
+        safe_last_tx = {k: v for k, v in last_transaction.items() if v is None or isinstance(v, (str, int, float, bool))}
+    last_tx_json = json.dumps(safe_last_tx)
     
-    for col_info in column_order:
-        pos = col_info.get('position', 0)
-        header = col_info.get('header_name', 'Unknown')
-        field = col_info.get('standardized_field', 'unknown')
-        data_type = col_info.get('data_type', 'unknown')
-        
-        field_descriptions.append(f"- Column {pos} ('{header}') → '{field}' field")
-        
-        # Build example based on data type
-        if data_type == 'date':
-            example_transaction[field] = "2024-01-01"
-        elif data_type in ['debit', 'credit', 'balance']:
-            example_transaction[field] = 1000.50
-        else:
-            example_transaction[field] = "example_value"
-    
-    field_desc_text = "\n".join(field_descriptions)
-    
-    # Create example transaction JSON (with escaped braces)
-    example_json_raw = json.dumps(example_transaction, indent=6)
-    example_json = example_json_raw.replace("{", "{{").replace("}", "}}")
-    
-    # --- START: Add context from last transaction ---
-    context_section = ""
-    if last_transaction:
-        # Sanitize for prompt injection
-        safe_last_tx = {k: v for k, v in last_transaction.items() if isinstance(v, (str, int, float, bool) or v is None)}
-        last_tx_json = json.dumps(safe_last_tx, indent=2)
-        # Escape all curly braces for LangChain template
-        escaped_json = last_tx_json.replace("{", "{{").replace("}", "}}")
-        
-        context_section = f"""
+    return f"""
 CONTEXT FROM PREVIOUS PAGE:
-- The previous page's last transaction was: {escaped_json}
-- Ensure all fields in the new transactions you extract follow the SAME data format.
-- For example, if 'running_balance' was a number, it must remain a number. If a date was 'YYYY-MM-DD', new dates must also be in that format.
-- Apply this formatting logic to ALL columns to maintain consistency.
+- The previous page's last transaction, as you returned it: {last_tx_json}
+- Map the columns of the new transactions the SAME way, and keep writing dates as YYYY-MM-DD.
 """
-    # --- END: Add context from last transaction ---
 
+def build_transaction_system_prompt(column_structure_json: str) -> str:
+    """
+    Build the static system message text for a column structure, given as its sorted JSON.
+    Called through the cached build_transaction_prompt, so each layout is assembled once.
+    """
+    column_structure = json.loads(column_structure_json)
+    column_order = column_structure.get('column_order', [])
+    field_names = ", ".join(col_info.get('standardized_field', 'unknown') for col_info in column_order)
+    
+    # Compact JSON states the mapping in far fewer tokens than a prose list (braces escaped for the prompt template)
+    column_order_json = json.dumps(column_order, separators=(',', ':'), ensure_ascii=False)
+    column_order_json = column_order_json.replace("{", "{{").replace("}", "}}")
+    
     template = f"""You are a precise bank statement data extraction engine. Your PRIMARY GOAL is to extract EVERY SINGLE transaction that has a date - NEVER skip any transaction row.
 
-COLUMN MAPPING (based on detected structure):
-{field_desc_text}
-
-CRITICAL EXTRACTION RULES:
-1. EXTRACT EVERY ROW that contains a date - this is MANDATORY
-2. Even if column headers are NOT visible on this page, use the column positions from above
-3. Map data from each column position to the corresponding standardized field
-4. Look for the table structure even if headers are missing - data follows the same column order
-5. Use column position (1st, 2nd, 3rd, etc.) not header names for mapping
-{context_section}
-
-MANDATORY EXTRACTION INSTRUCTIONS:
-1. Scan the ENTIRE page systematically from top to bottom
-2. Look for ANY row that contains a date (in ANY format: DD-MM-YYYY, MM/DD/YYYY, DD/MM/YY, etc.)
-3. If you find a date, that row MUST be extracted as a transaction - NO EXCEPTIONS
-4. Some transactions may span multiple rows - combine them into single entries
-5. Look for dates even in merged cells, partial tables, or broken table structures
-6. Extract transactions even if some columns are empty or missing
-7. DO NOT skip transactions because of formatting issues or unclear data
-
-DATA FORMATTING RULES:
-1. Output a JSON array [...] of transaction objects, no other text or keys
-2. Convert ALL dates to YYYY-MM-DD format (parse flexibly: 01-Jan-2024 → 2024-01-01)
-3. MONETARY VALUES MUST BE PURE NUMBERS ONLY:
-   - Remove ALL text suffixes: "1,250.50 Cr" → 1250.50
-   - Remove ALL currency symbols: "Rs.1,250.50" → 1250.50  
-   - Remove ALL prefixes/suffixes: "Dr 500.00", "500.00 Dr", "500.00 Cr" → 500.00
-   - Remove commas from numbers: "1,250.50" → 1250.50
-   - Convert to decimal numbers: 1250.50 (NOT strings)
-4. Use null for missing values, but still include the transaction
-5. Do NOT extract numbers from descriptions as debit, credit, or balance
-6. CRITICAL: All monetary amounts must be POSITIVE numbers:
-   - Debit amounts should be positive (e.g., 500.00, NOT -500.00)
-   - Credit amounts should be positive (e.g., 1000.00, NOT -1000.00) 
-   - Debit already means "money out", so don't make it negative
-   - Credit already means "money in", so keep it positive
-7. Preserve all original description text exactly as written
-
-CRITICAL MONETARY CLEANING EXAMPLES:
-- "1,142,432.00Cr" → 1142432.00 (credit amount, positive)
-- "Rs.50,000.00" → 50000.00 (remove currency symbol)
-- "5000 Dr" → 5000.00 (debit amount, positive - NOT negative)
-- "2,500.75 Cr" → 2500.75 (credit amount, positive)
-- "$1,000.00" → 1000.00 (remove currency symbol)
-- "-500.00 Dr" → 500.00 (debit should be positive, remove minus sign)
-
-WHAT TO IGNORE (but still check for dates):
-- Page headers/footers without dates
-- Opening/closing balance statements WITHOUT transaction dates
-- Summary rows without specific transaction dates
-- Account information sections
-
-WHAT TO ALWAYS EXTRACT:
-- ANY row with a transaction date
-- Transaction descriptions (even if incomplete)
-- Any monetary amounts in the correct columns
-- Reference numbers or transaction IDs
-- Running balances when available
-
-CRITICAL: If the page is completely blank or contains no dates whatsoever, return an empty array. Otherwise, you MUST extract every single row that contains a date.
-
-VERIFICATION CHECKLIST before outputting:
-☐ Did I scan the ENTIRE page for dates?
-☐ Did I extract EVERY row that contains a date?
-☐ Did I check for multi-row transactions?
-☐ Did I look in broken or partial tables?
-☐ Are all dates in YYYY-MM-DD format?
-☐ Are all monetary values positive numbers?
-
-ONLY RETURN THE JSON ARRAY AND NOTHING ELSE. NO EXTRA TEXT OR COMMENTS.
-EXAMPLE:
-```markdown
-| Date       | Particulars         | Withdrawal | Deposit | Balance  | Reference |
-|------------|---------------------|------------|---------|----------|-----------|
-| 01-Jan-2024| SALARY CREDIT       |            | 50000.00| 75000.00 | SAL001    |
-| 02-Jan-2024| ATM WITHDRAWAL 1234 | 5000.00    |         | 70000.00 | ATM123    |
+COLUMN_ORDER = {column_order_json}
+Map table cells to these standardized_field names by position. Each transaction is an array with one value per column, in this order: [{field_names}]
+
+RULES:
+1. Extract EVERY row that has a transaction date (in any format), even in partial or broken tables and on pages without visible headers
+2. Map cells by column position, not header names; combine a transaction that spans several lines into one row
+3. The text may hold several pages, each starting with a <!-- PAGE n --> marker - return the transactions of ALL pages in one array, in page order
+4. Write dates as YYYY-MM-DD (01-Jan-2024 → 2024-01-01)
+5. Copy amounts exactly as printed, as strings (e.g. "1,250.50 Cr", "Rs.500.00") - they are cleaned afterwards
+6. Use null for empty cells; copy descriptions exactly; never take amounts from description text
+7. Skip rows without a transaction date (headers, footers, opening/closing balance and summary lines)
+8. Output {{{{"transactions": [[...], ...]}}}} with one value array per transaction, or {{{{"transactions": []}}}} if the page has none
+
+EXAMPLE (tables are given as CSV, one block per table):
+```
+Date,Particulars,Withdrawal,Deposit,Balance,Reference
+01-Jan-2024,SALARY CREDIT,,50000.00,75000.00,SAL001
+02-Jan-2024,ATM WITHDRAWAL 1234,5000.00,,70000.00,ATM123
 ```
-Output:
-[
-  {{{{
-    "date": "2024-01-01",
-    "description": "SALARY CREDIT",
-    "debit": null,
-    "credit": 50000.00,
-    "running_balance": 75000.00,
-    "reference": "SAL001"
-  }}}},
-  {{{{
-    "date": "2024-01-02", 
-    "description": "ATM WITHDRAWAL 1234",
-    "debit": 5000.00,
-    "credit": null,
-    "running_balance": 70000.00,
-    "reference": "ATM123"
-  }}}}
-]
-
-JSON Example for your document structure:
-[
-  {example_json}
-]
+Output for columns [date, description, debit, credit, running_balance, reference]:
+{{{{"transactions": [
+  ["2024-01-01", "SALARY CREDIT", null, "50000.00", "75000.00", "SAL001"],
+  ["2024-01-02", "ATM WITHDRAWAL 1234", "5000.00", null, "70000.00", "ATM123"]
+]}}}}
+"""
+
+    return template
+
+def build_transaction_schema(column_structure: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the JSON schema of a transaction reply for Ollama's structured outputs.
+    Each transaction is an array with one string-or-null value per column, in column order;
+    amounts stay as printed and are converted by clean_page_transactions.
+    """
+    column_count = len(column_structure.get('column_order', []))
+    
+    return {
+        "type": "object",
+        "properties": {
+            "transactions": {
+                "type": "array",
+                "items": {
+                    "type": "array",
+                    "prefixItems": [{"type": ["string", "null"]}] * column_count,
+                    "minItems": column_count,
+                    "maxItems": column_count
+                }
+            }
+        },
+        "required": ["transactions"]
+    }
 
+def create_detailed_transaction_prompt(column_structure: Dict[str, Any]) -> ChatPromptTemplate:
+    """
+    Create a detailed transaction extraction prompt based on your original specifications.
+    The instructions form a static system message so Ollama can reuse its KV cache across pages;
+    the user message takes the page text and the previous-page context (see format_previous_context).
+    """
+    return build_transaction_prompt(json.dumps(column_structure, sort_keys=True))
+
+@functools.lru_cache(maxsize=8)
+def build_transaction_prompt(column_structure_json: str) -> ChatPromptTemplate:
+    """Build the transaction prompt once per column structure (keyed on its sorted JSON)."""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    template = build_transaction_system_prompt(column_structure_json)
+    
+    # The previous-page context is an input variable, so one prompt serves the whole run
+    user_template = """{previous_context}
 Extract from:
-```markdown
-{{document_text}}
+```
+{document_text}
 ```"""
 
-    return PromptTemplate(
-        template=template,
-        input_variables=["document_text"],
-    )
+    return ChatPromptTemplate.from_messages([
+        ("system", template),
+        ("user", user_template),
+    ])
+
+def group_pages_for_llm(pages: List[tuple], max_pages: int, max_chars: int) -> List[List[tuple]]:
+    """
+    Pack consecutive (page_num, text) pairs into groups of at most max_pages whose combined text fits max_chars.
+    A page larger than the budget still gets a group of its own.
+    """
+    groups = []
+    current_group = []
+    current_chars = 0
+    for page in pages:
+        page_chars = len(page[1]) + 20 # Room for the page marker
+        if current_group and (len(current_group) >= max_pages or current_chars + page_chars > max_chars):
+            groups.append(current_group)
+            current_group = []
+            current_chars = 0
+        current_group.append(page)
+        current_chars += page_chars
+    if current_group:
+        groups.append(current_group)
+    return groups
+
+def join_page_texts(pages: List[tuple]) -> str:
+    """Concatenate page texts for one LLM call, each behind a <!-- PAGE n --> marker."""
+    if len(pages) == 1:
+        return pages[0][1]
+    return "\n\n".join(f"<!-- PAGE {page_num} -->\n{text}" for page_num, text in pages)
+
+def get_transaction_list(result: Any) -> Optional[List[Any]]:
+    """Unwrap the transaction rows from a parsed reply; returns None if the reply has the wrong shape."""
+    # JSON mode returns an object, so the rows arrive wrapped as {"transactions": [...]}
+    transactions = result.get('transactions') if isinstance(result, dict) else result
+    return transactions if isinstance(transactions, list) else None
+
+def clean_page_transactions(
+    result: List[Any],
+    column_structure: Dict[str, Any],
+    date_fields: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Keep the transaction objects from one page's LLM output and normalize their monetary and date fields.
+    """
+    import pandas as pd
+    
+    # Rows come back as value arrays in column order; map them onto the standardized field names
+    field_names = [col_info.get('standardized_field') for col_info in column_structure.get('column_order', [])]
+    valid_transactions = [
+        dict(zip(field_names, tx)) if isinstance(tx, list) else dict(tx)
+        for tx in result
+        if tx and isinstance(tx, (list, dict))
+    ]
+    
+    # Amounts arrive as printed; convert each monetary field (debit, credit, balance) for the whole page at once
+    monetary_fields = [
+        col_info.get('standardized_field')
+        for col_info in column_structure.get('column_order', [])
+        if col_info.get('data_type') in ['debit', 'credit', 'balance']
+    ]
+    for field in monetary_fields:
+        cleaned_values = clean_monetary_values([tx.get(field) for tx in valid_transactions])
+        for tx, cleaned_value in zip(valid_transactions, cleaned_values):
+            if field in tx:
+                tx[field] = cleaned_value
+                        
+    # Post-process to standardize date formats, one pandas call per date field for the whole page
+    for field in date_fields:
+        values = pd.Series([tx.get(field) or None for tx in valid_transactions], dtype=object)
+        try:
+            parsed = pd.to_datetime(values, errors='coerce')
+            # The format is inferred from the first value; parse the odd ones out individually
+            unparsed = parsed.isna() & values.notna()
+            if unparsed.any():
+                parsed[unparsed] = pd.to_datetime(values[unparsed], errors='coerce', format='mixed')
+        except Exception:
+            # In case of any other parsing error, keep the original values
+            continue
+        for tx, standardized_date in zip(valid_transactions, parsed.dt.strftime('%Y-%m-%d')):
+            if isinstance(standardized_date, str):
+                tx[field] = standardized_date
+    
+    return valid_transactions
 
-def run_improved_docling_pipeline(pdf_path: str, model_name: str, output_path: str):
+def get_output_columns(column_structure: Dict[str, Any]) -> List[str]:
+    """
+    Return the CSV column order: transaction_id and the standard fields first, then custom fields in table order.
+    """
+    structure_fields = [
+        col['standardized_field']
+        for col in column_structure.get('column_order', [])
+        if col.get('standardized_field')
+    ]
+    
+    # Reorder columns for better readability
+    standard_columns = ['date', 'description', 'debit', 'credit', 'running_balance', 'reference']
+    output_columns = ['transaction_id']
+    output_columns.extend([col for col in standard_columns if col in structure_fields])
+    output_columns.extend([col for col in structure_fields if col not in output_columns])
+    return output_columns
+
+def run_improved_docling_pipeline(
+    pdf_path: str,
+    model_name: str,
+    output_path: str,
+    pdf_backend: str = "pypdfium",
+    table_mode: str = "accurate",
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    llm_batch_pages: int = LLM_BATCH_PAGES,
+    docling_workers: int = 1,
+    use_cache: bool = True,
+    debug: bool = False,
+    force_llm_all: bool = False,
+    use_text_layer: bool = False,
+    header_model_name: Optional[str] = None,
+    device: str = "auto"
+):
     """
     Improved pipeline: Extract headers first, then use standardized prompt for all pages.
+    With debug=True the detected structure, page markdown and raw LLM output are saved to debug_logs/.
+    Pages without any date and amount skip the LLM unless force_llm_all is set.
+    After the first page with transactions, up to llm_batch_pages pages are sent in each LLM call.
+    With use_text_layer, pages with an embedded text layer skip Docling (faster, but tables lose their CSV structure).
+    header_model_name picks a (smaller) model for the header scan; it defaults to model_name.
+    device selects where Docling runs its layout and table models ("auto", "cpu", "cuda" or "mps").
     """
     if not os.path.exists(pdf_path):
-        print(f"Error: Input PDF not found at '{pdf_path}'")
+        logger.error(f"Error: Input PDF not found at '{pdf_path}'")
         return
 
     # Create debug directory
     debug_dir = "debug_logs"
-    os.makedirs(debug_dir, exist_ok=True)
+    if debug:
+        os.makedirs(debug_dir, exist_ok=True)
 
+    # Convert the PDF chunk by chunk, with the next chunk converting in a background thread while the
+    # LLM scans headers on the first chunk and extracts each one. Worker processes load their own
+    # models, so with several workers the whole PDF is one chunk, converted on the main thread
+    pdf = pdfium.PdfDocument(pdf_path)
+    total_pages = len(pdf)
+    pdf.close()
+    if total_pages == 0:
+        logger.error(f"Error: '{pdf_path}' has no pages")
+        return
+    
+    if docling_workers <= 1:
+        chunk_starts = [1] + list(range(HEADER_SCAN_PAGES + 1, total_pages + 1, DOCLING_CHUNK_PAGES))
+    else:
+        chunk_starts = [1]
+    chunk_ranges = [
+        (start_page, next_start - 1)
+        for start_page, next_start in zip(chunk_starts, chunk_starts[1:] + [total_pages + 1])
+        if start_page <= total_pages
+    ]
+    
+    def convert_chunk(chunk_index):
+        """Convert one chunk of pages to page markdown."""
+        start_page, end_page = chunk_ranges[chunk_index]
+        return convert_pdf_to_page_markdown(
+            pdf_path,
+            pdf_backend=pdf_backend,
+            table_mode=table_mode,
+            workers=docling_workers,
+            start_page=start_page,
+            end_page=end_page,
+            use_cache=use_cache,
+            use_text_layer=use_text_layer,
+            device=device
+        )
+    
+    try:
+        page_markdowns = convert_chunk(0)
+    except Exception as e:
+        logger.error(f"Error converting PDF: {e}")
+        return
+    
+    # Only one chunk is converted ahead, so an early exit leaves at most one conversion to wait for
+    conversion_executor = ThreadPoolExecutor(max_workers=1)
+    
+    def submit_next_chunk(chunk_index):
+        """Start converting the chunk after chunk_index in the background; None after the last chunk."""
+        if chunk_index + 1 < len(chunk_ranges):
+            return conversion_executor.submit(convert_chunk, chunk_index + 1)
+        return None
+    
+    next_chunk = submit_next_chunk(0)
+    
     # Step 1: Extract column headers/structure
-    print("="*60)
-    print("STEP 1: EXTRACTING COLUMN HEADERS")
-    print("="*60)
+    logger.info("="*60)
+    logger.info("STEP 1: EXTRACTING COLUMN HEADERS")
+    logger.info("="*60)
     
-    column_structure = extract_headers_only(pdf_path, model_name)
+    column_structure = extract_headers_only(
+        pdf_path,
+        header_model_name or model_name,
+        pdf_backend=pdf_backend,
+        table_mode=table_mode,
+        use_cache=use_cache,
+        page_markdowns=page_markdowns
+    )
     
     if not column_structure:
-        print("❌ Could not detect table structure. Exiting.")
+        logger.error("❌ Could not detect table structure. Exiting.")
+        # Wait for the chunk converting ahead, so no Docling work outlives this call
+        conversion_executor.shutdown(wait=True, cancel_futures=True)
         return
         
-    # Identify debit/credit fields that should always be positive
-    positive_fields = []
+    # Identify monetary fields; clean_page_transactions turns them into positive numbers
+    monetary_fields = []
     for col in column_structure.get('column_order', []):
-        if col.get('data_type') in ['debit', 'credit']:
+        if col.get('data_type') in ['debit', 'credit', 'balance']:
             if standardized_field := col.get('standardized_field'):
-                positive_fields.append(standardized_field)
+                monetary_fields.append(standardized_field)
     
-    if positive_fields:
-        print(f"ⓘ Forcing positive values for: {positive_fields}")
+    if monetary_fields:
+        logger.info(f"ⓘ Cleaning amounts to positive numbers for: {monetary_fields}")
         
     # Identify date fields for consistent formatting
     date_fields = []
@@ -462,185 +966,283 @@ def run_improved_docling_pipeline(pdf_path: str, model_name: str, output_path: s
                 date_fields.append(standardized_field)
 
     if date_fields:
-        print(f"ⓘ Standardizing date format for: {date_fields}")
+        logger.info(f"ⓘ Standardizing date format for: {date_fields}")
     
     # Save detected structure
-    with open(os.path.join(debug_dir, "detected_column_structure.json"), "w") as f:
-        json.dump(column_structure, f, indent=2)
+    if debug:
+        with open(os.path.join(debug_dir, "detected_column_structure.json"), "wb") as f:
+            f.write(orjson.dumps(column_structure, option=orjson.OPT_INDENT_2))
     
-    print(f"✓ Column structure detected:")
+    logger.info(f"✓ Column structure detected:")
     for col in column_structure.get('column_order', []):
         header_name = col.get('header_name', 'Unknown')
         standardized_field = col.get('standardized_field', 'unknown')
         position = col.get('position', '?')
-        print(f"  {position}: {header_name} → {standardized_field}")
+        logger.info(f"  {position}: {header_name} → {standardized_field}")
     
     # Step 2: Set up model and parser
-    print("\n" + "="*60)
-    print("STEP 2: PREPARING EXTRACTION MODEL")
-    print("="*60)
+    logger.info("\n" + "="*60)
+    logger.info("STEP 2: PREPARING EXTRACTION MODEL")
+    logger.info("="*60)
     
-    # Initialize these once
-    parser = JsonOutputParser()
-    model = ChatOllama(model=model_name, temperature=0.1)
-    print("✓ Model and parser are ready.")
+    # Initialize these once; the column structure is fixed for the rest of the run
+    parser = get_json_parser()
+    model = create_chat_model(model_name, build_transaction_schema(column_structure))
+    transaction_prompt = create_detailed_transaction_prompt(column_structure)
+    transaction_chain = transaction_prompt | model | parser
+    logger.info("✓ Model, prompt and parser are ready.")
 
     # Step 3: Process all pages with the same prompt
-    print("\n" + "="*60)
-    print("STEP 3: EXTRACTING TRANSACTIONS FROM ALL PAGES")
-    print("="*60)
+    logger.info("\n" + "="*60)
+    logger.info("STEP 3: EXTRACTING TRANSACTIONS FROM ALL PAGES")
+    logger.info("="*60)
     
-    all_transactions = []
-    last_successful_transaction = None # To provide context to the next page
+    transaction_count = 0
+    last_successful_transaction = None # Raw reply row that provides context to the next page
     
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Split PDF into pages
-        try:
-            reader = PdfReader(pdf_path)
-            for i, page in enumerate(reader.pages):
-                writer = PdfWriter()
-                writer.add_page(page)
-                page_pdf_path = os.path.join(temp_dir, f"page_{i+1:03}.pdf")
-                with open(page_pdf_path, "wb") as f:
-                    writer.write(f)
-        except Exception as e:
-            print(f"Error splitting PDF: {e}")
-            return
+    def select_transaction_pages(chunk_markdowns):
+        """Return the (page_num, text) pairs of one converted chunk that should go to the LLM."""
+        selected_pages = []
+        for page_num, markdown_content in chunk_markdowns.items():
+            if not markdown_content.strip():
+                logger.warning(f"Warning: No content extracted from page {page_num}")
+                continue
             
-        page_files = sorted(glob.glob(os.path.join(temp_dir, "*.pdf")))
-        
-        # Process each page, now with context
-        for i, page_pdf in enumerate(page_files):
-            page_num = i + 1
-            print(f"\n--- Processing Page {page_num} of {len(page_files)} ---")
+            # Save markdown for debugging
+            if debug:
+                with open(os.path.join(debug_dir, f"page_{page_num}_markdown.txt"), "w", encoding="utf-8") as f:
+                    f.write(markdown_content)
             
-            # Create a new prompt for each page, potentially with context
-            transaction_prompt = create_detailed_transaction_prompt(
-                column_structure,
-                last_transaction=last_successful_transaction
-            )
-            transaction_chain = transaction_prompt | model | parser
+            # Pages without any date and amount would only come back empty from the LLM
+            if not force_llm_all and not looks_like_transaction_page(markdown_content):
+                logger.info(f"ⓘ Skipping page {page_num}: no dates and amounts found")
+                continue
             
-            # Convert to markdown
-            pipeline_options = PdfPipelineOptions(do_table_structure=True)
-            pipeline_options.table_structure_options.do_cell_matching = True
-            pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
-            docling_format_options = {InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-            converter = DocumentConverter(format_options=docling_format_options)
+            selected_pages.append((page_num, markdown_content))
+        return selected_pages
+    
+    def record_page_result(page_num, result):
+        """Save and clean the LLM output for one page, then append its rows to the CSV."""
+        nonlocal last_successful_transaction, transaction_count
+    
+        # Save LLM output
+        if debug:
+            with open(os.path.join(debug_dir, f"page_{page_num}_transactions.json"), "wb") as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    
+        transactions = get_transaction_list(result)
+        if transactions is None:
+            logger.warning(f"⚠ Invalid response format from page {page_num}: {type(result)}")
+            return
+    
+        valid_transactions = clean_page_transactions(transactions, column_structure, date_fields)
+        if valid_transactions:
+            # Add transaction IDs and write the page straight to the CSV
+            for tx in valid_transactions:
+                transaction_count += 1
+                tx['transaction_id'] = transaction_count
+            csv_writer.writerows(valid_transactions)
+            output_file.flush()
+        
+            # Update context with the reply row itself, not the cleaned copy with floats and transaction_id
+            last_successful_transaction = next(tx for tx in reversed(transactions) if tx and isinstance(tx, (list, dict)))
+            logger.info(f"✓ Extracted {len(valid_transactions)} transactions from page {page_num}")
+        else:
+            logger.info(f"ⓘ No transactions found on page {page_num}")
+    
+    def invoke_cached(role, input_data):
+        """Run the transaction chain, reusing a cached reply for an identical prompt."""
+        cache_path = get_llm_cache_path(model_name, role, transaction_prompt, input_data)
+        result = load_cached_llm_response(cache_path) if use_cache else None
+        if result is not None:
+            logger.info("✓ Reusing cached LLM response")
+            return result
+        result = transaction_chain.invoke(input_data)
+        if use_cache:
+            save_cached_llm_response(cache_path, result)
+        return result
+    
+    def extract_pages(pending_pages):
+        """Extract the selected pages of one chunk and append their rows to the CSV."""
+        # Process pages one at a time until a transaction is found, so the rest have formatting context
+        while pending_pages and last_successful_transaction is None:
+            page_num, markdown_content = pending_pages.pop(0)
+            logger.info(f"\n--- Processing Page {page_num} of {total_pages} ---")
+        
+            try:
+                input_data = {"document_text": markdown_content, "previous_context": format_previous_context()}
+                result = invoke_cached("first", input_data)
+                record_page_result(page_num, result)
+            except Exception as e:
+                logger.error(f"Error processing page {page_num}: {e}")
+                continue
+        
+        # The remaining pages share that context, so they are packed a few per call and sent as one concurrent batch
+        if pending_pages:
+            previous_context = format_previous_context(last_successful_transaction)
+            prompt_chars = len(transaction_prompt.format(document_text="", previous_context=previous_context))
+            max_chars = (OLLAMA_NUM_CTX - LLM_OUTPUT_TOKEN_RESERVE) * CHARS_PER_TOKEN - prompt_chars
+            page_groups = group_pages_for_llm(pending_pages, max(1, llm_batch_pages), max_chars)
             
-            loader = DoclingLoader(
-                file_path=page_pdf,
-                export_type=ExportType.MARKDOWN,
-                converter=converter
-            )
+            page_numbers = [page_num for page_num, _ in pending_pages]
+            logger.info(f"\n--- Processing Pages {page_numbers[0]}-{page_numbers[-1]} of {total_pages} "
+                  f"in {len(page_groups)} LLM calls (max_concurrency={max(1, max_concurrency)}) ---")
+        
+            batch_inputs = [
+                {"document_text": join_page_texts(group), "previous_context": previous_context}
+                for group in page_groups
+            ]
+            cache_paths = [
+                get_llm_cache_path(model_name, "next", transaction_prompt, input_data)
+                for input_data in batch_inputs
+            ]
+            results = [
+                load_cached_llm_response(cache_path) if use_cache else None
+                for cache_path in cache_paths
+            ]
             
-            try:
-                page_docs = loader.load()
-                if not page_docs or not page_docs[0].page_content.strip():
-                    print(f"Warning: No content extracted from page {page_num}")
-                    continue
-                    
-                markdown_content = page_docs[0].page_content
-                
-                # Save markdown for debugging
-                with open(os.path.join(debug_dir, f"page_{page_num}_markdown.txt"), "w", encoding="utf-8") as f:
-                    f.write(markdown_content)
-                
-                # Extract transactions using the context-aware prompt
-                result = parse_with_retry(transaction_chain, {"document_text": markdown_content})
+            # Only groups without a cached response go to Ollama
+            misses = [i for i, result in enumerate(results) if result is None]
+            if len(misses) < len(results):
+                logger.info(f"✓ Reusing cached LLM responses for {len(results) - len(misses)} calls")
+            if misses:
+                batch_results = transaction_chain.batch(
+                    [batch_inputs[i] for i in misses],
+                    config={"max_concurrency": max(1, max_concurrency)},
+                    return_exceptions=True
+                )
+                for i, result in zip(misses, batch_results):
+                    results[i] = result
+        
+            for i, (group, result) in enumerate(zip(page_groups, results)):
+                group_label = f"{group[0][0]}-{group[-1][0]}" if len(group) > 1 else str(group[0][0])
                 
-                # Save LLM output
-                with open(os.path.join(debug_dir, f"page_{page_num}_transactions.json"), "w", encoding="utf-8") as f:
-                    json.dump(result, f, indent=2)
+                if not isinstance(result, Exception) and get_transaction_list(result) is not None:
+                    if use_cache and i in misses:
+                        save_cached_llm_response(cache_paths[i], result)
+                    record_page_result(group_label, result)
+                    continue
                 
-                if isinstance(result, list):
-                    valid_transactions = [tx for tx in result if tx and isinstance(tx, dict)]
-                    
-                    # Post-process to clean all monetary fields
-                    for tx in valid_transactions:
-                        for col_info in column_structure.get('column_order', []):
-                            field = col_info.get('standardized_field')
-                            data_type = col_info.get('data_type')
-                            
-                            # Clean monetary fields (debit, credit, balance)
-                            if data_type in ['debit', 'credit', 'balance'] and field in tx:
-                                tx[field] = clean_monetary_value(tx[field])
-                    
-                    # Additional cleanup for positive_fields (legacy support)
-                    if positive_fields:
-                        for tx in valid_transactions:
-                            for field in positive_fields:
-                                if field in tx and tx[field] is not None:
-                                    tx[field] = clean_monetary_value(tx[field])
-                                        
-                    # Post-process to standardize date formats
-                    if date_fields:
-                        for tx in valid_transactions:
-                            for field in date_fields:
-                                if field in tx and tx[field]:
-                                    try:
-                                        # Use pandas to flexibly parse the date and format it
-                                        standardized_date = pd.to_datetime(tx[field], errors='coerce')
-                                        if pd.notna(standardized_date):
-                                            tx[field] = standardized_date.strftime('%Y-%m-%d')
-                                    except Exception:
-                                        # In case of any other parsing error, keep original
-                                        pass
-                                        
-                    if valid_transactions:
-                        all_transactions.extend(valid_transactions)
-                        last_successful_transaction = valid_transactions[-1] # Update context
-                        print(f"✓ Extracted {len(valid_transactions)} transactions from page {page_num}")
-                    else:
-                        print(f"ⓘ No transactions found on page {page_num}")
-                else:
-                    print(f"⚠ Invalid response format from page {page_num}: {type(result)}")
-                    
+                # Fall back to one page per call
+                reason = result if isinstance(result, Exception) else "invalid response format"
+                logger.warning(f"  ⚠ Batched extraction failed for page {group_label}: {reason}. Retrying page by page...")
+                for page_num, markdown_content in group:
+                    try:
+                        input_data = {"document_text": markdown_content, "previous_context": previous_context}
+                        result = invoke_cached("next", input_data)
+                        record_page_result(page_num, result)
+                    except Exception as e:
+                        logger.error(f"Error processing page {page_num}: {e}")
+                        continue
+
+    # Rows are written to a .partial file as each page is extracted, so earlier pages survive a crash;
+    # it only replaces output_path once the run has extracted something
+    output_columns = get_output_columns(column_structure)
+    partial_path = output_path + ".partial"
+    output_file = open(partial_path, "w", newline="", encoding="utf-8")
+    csv_writer = csv.DictWriter(output_file, fieldnames=output_columns, extrasaction="ignore")
+    csv_writer.writeheader()
+    
+    try:
+        extract_pages(select_transaction_pages(page_markdowns))
+        for chunk_index in range(1, len(chunk_ranges)):
+            try:
+                chunk_markdowns = next_chunk.result()
             except Exception as e:
-                print(f"Error processing page {page_num}: {e}")
-                continue
+                logger.error(f"Error converting PDF: {e}")
+                break
+            next_chunk = submit_next_chunk(chunk_index)
+            extract_pages(select_transaction_pages(chunk_markdowns))
+    finally:
+        output_file.close()
+        # Wait for a conversion still running, so no Docling work outlives this call
+        conversion_executor.shutdown(wait=True, cancel_futures=True)
 
     # Step 4: Save final results
-    print("\n" + "="*60)
-    print("STEP 4: SAVING RESULTS")
-    print("="*60)
+    logger.info("\n" + "="*60)
+    logger.info("STEP 4: SAVING RESULTS")
+    logger.info("="*60)
     
-    if not all_transactions:
-        print("❌ No transactions extracted from any page")
+    if transaction_count == 0:
+        os.remove(partial_path)
+        logger.error("❌ No transactions extracted from any page")
         return
+    os.replace(partial_path, output_path)
     
-    # Add transaction IDs
-    for i, tx in enumerate(all_transactions):
-        tx['transaction_id'] = i + 1
-    
-    # Create DataFrame and save
-    try:
-        df = pd.DataFrame(all_transactions)
-        
-        # Reorder columns for better readability
-        standard_columns = ['transaction_id', 'date', 'description', 'debit', 'credit', 'running_balance', 'reference']
-        final_columns = [col for col in standard_columns if col in df.columns]
-        final_columns.extend([col for col in df.columns if col not in final_columns])
-        
-        df = df[final_columns]
-        df.to_csv(output_path, index=False, encoding='utf-8')
-        
-        print(f"✅ SUCCESS!")
-        print(f"📁 Output saved to: {output_path}")
-        print(f"📊 Total transactions: {len(df)}")
-        print(f"📋 Columns: {list(df.columns)}")
-        print(f"🔍 Debug files saved to: {debug_dir}/")
-        
-    except Exception as e:
-        print(f"❌ Error saving results: {e}")
+    logger.info(f"✅ SUCCESS!")
+    logger.info(f"📁 Output saved to: {output_path}")
+    logger.info(f"📊 Total transactions: {transaction_count}")
+    logger.info(f"📋 Columns: {output_columns}")
+    if debug:
+        logger.info(f"🔍 Debug files saved to: {debug_dir}/")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Improved bank statement extraction with header-first and context-aware approach")
     parser.add_argument("input_pdf", help="Path to the input PDF file")
-    parser.add_argument("--model", default="llama3.1:8b", help="Ollama model name")
+    parser.add_argument(
+        "--model",
+        "--tx-model",
+        dest="model",
+        default="llama3.1:8b-instruct-q4_K_M",
+        help="Ollama model for transaction extraction"
+    )
+    parser.add_argument(
+        "--header-model",
+        default="llama3.2:3b-instruct-q4_K_M",
+        help="Ollama model for the column-header scan; a small model is enough for this task"
+    )
     parser.add_argument("--output", help="Output CSV file path")
+    parser.add_argument(
+        "--pdf-backend",
+        choices=["pypdfium", "native"],
+        default="pypdfium",
+        help="Docling PDF backend: pypdfium (faster, less memory) or native docling-parse"
+    )
+    parser.add_argument(
+        "--table-mode",
+        choices=["accurate", "fast"],
+        default="accurate",
+        help="TableFormer mode: accurate (best on complex tables) or fast (several times quicker)"
+    )
+    parser.add_argument(
+        "--device",
+        choices=["auto", "cpu", "cuda", "mps"],
+        default="auto",
+        help="Device for Docling's layout and TableFormer models (auto uses a GPU when one is available)"
+    )
+    parser.add_argument(
+        "--docling-workers",
+        type=int,
+        default=1,
+        help="Number of processes converting page ranges in parallel (each loads its own Docling models)"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=LLM_MAX_CONCURRENCY,
+        help="LLM calls sent to Ollama at once; match the server's OLLAMA_NUM_PARALLEL"
+    )
+    parser.add_argument(
+        "--llm-batch-pages",
+        type=int,
+        default=LLM_BATCH_PAGES,
+        help="Maximum pages packed into one LLM call after the first page with transactions (1 disables packing)"
+    )
+    parser.add_argument("--debug", action="store_true", help="Save page markdown and raw LLM output to debug_logs/")
+    parser.add_argument(
+        "--force-llm-all",
+        action="store_true",
+        help="Send every page to the LLM, even ones without dates and amounts (audit mode)"
+    )
+    parser.add_argument(
+        "--text-layer",
+        action="store_true",
+        help="Use the PDF's embedded text layer where it has one and skip Docling for those pages (fast path)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't write the on-disk conversion and LLM response caches")
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     if args.output:
         output_path = args.output
@@ -648,4 +1250,19 @@ if __name__ == "__main__":
         base_name = os.path.splitext(os.path.basename(args.input_pdf))[0]
         output_path = f"{base_name}_extracted_transactions.csv"
     
-    run_improved_docling_pipeline(args.input_pdf, args.model, output_path)
\ No newline at end of file
+    run_improved_docling_pipeline(
+        args.input_pdf,
+        args.model,
+        output_path,
+        pdf_backend=args.pdf_backend,
+        table_mode=args.table_mode,
+        max_concurrency=args.max_concurrency,
+        llm_batch_pages=args.llm_batch_pages,
+        docling_workers=args.docling_workers,
+        use_cache=not args.no_cache,
+        debug=args.debug,
+        force_llm_all=args.force_llm_all,
+        use_text_layer=args.text_layer,
+        header_model_name=args.header_model,
+        device=args.device
+    )
\ No newline at end of file